@@ -1,13 +1,40 @@
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, request, send_file, jsonify, g, abort, make_response
 from PIL import Image
 import io
 import os
+import re
+import json
+import uuid
+import shutil
+import math
+import random
+import hmac
+import hashlib
+import secrets
+import marshal
+import cProfile
+import tracemalloc
+import sys
+import time
+import itertools
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+from werkzeug.datastructures import FileStorage
+from werkzeug.middleware.proxy_fix import ProxyFix
 import tempfile
 import zipfile
 from datetime import datetime
 
+try:
+    import resource
+except ImportError:
+    resource = None  # not available on Windows
+
 # PDF and document processing libraries
 try:
     import PyPDF2
@@ -50,13 +77,653 @@ def allowed_file(filename):
 def get_temp_filename(extension):
     return os.path.join(UPLOAD_FOLDER, f"temp_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.{extension}")
 
+# Chunked upload staging area
+CHUNKED_UPLOAD_FOLDER = os.path.join(UPLOAD_FOLDER, 'chunked_uploads')
+app.config['CHUNKED_UPLOAD_MAX_SIZE'] = int(os.environ.get('CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024))  # 2GB
+app.config['CHUNKED_UPLOAD_TTL'] = int(os.environ.get('CHUNKED_UPLOAD_TTL', 24 * 60 * 60))  # seconds since last activity
+app.config['CHUNKED_UPLOAD_COMPLETED_TTL'] = int(os.environ.get('CHUNKED_UPLOAD_COMPLETED_TTL', 60 * 60))  # seconds since last use
+app.config['CHUNKED_UPLOAD_CLIENT_QUOTA'] = int(os.environ.get('CHUNKED_UPLOAD_CLIENT_QUOTA', 4 * 1024 * 1024 * 1024))  # 4GB
+app.config['CHUNKED_UPLOAD_CLIENT_MAX_UPLOADS'] = int(os.environ.get('CHUNKED_UPLOAD_CLIENT_MAX_UPLOADS', 10))
+app.config['CHUNKED_UPLOAD_TOTAL_QUOTA'] = int(os.environ.get('CHUNKED_UPLOAD_TOTAL_QUOTA', 20 * 1024 * 1024 * 1024))  # 20GB
+DEFAULT_CHUNK_SIZE = 5 * 1024 * 1024
+MIN_CHUNK_SIZE = 1024 * 1024  # only the last chunk may be smaller
+MAX_CHUNK_SIZE = 20 * 1024 * 1024  # must stay below MAX_CONTENT_LENGTH
+MAX_TOTAL_CHUNKS = 10000
+CHUNKED_UPLOAD_GC_INTERVAL = 10 * 60  # seconds
+UPLOAD_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+COPY_BLOCK_SIZE = 1024 * 1024
+
+chunked_upload_lock = threading.Lock()
+last_upload_gc = 0.0
+
+def get_chunked_upload_dir(upload_id):
+    """Staging directory of an existing upload, or None."""
+    if not UPLOAD_ID_PATTERN.fullmatch(upload_id):
+        return None
+    path = os.path.join(CHUNKED_UPLOAD_FOLDER, upload_id)
+    return path if os.path.isdir(path) else None
+
+def load_upload_meta(upload_dir):
+    with open(os.path.join(upload_dir, 'meta.json')) as meta_file:
+        return json.load(meta_file)
+
+def save_upload_meta(upload_dir, meta):
+    temp_path = os.path.join(upload_dir, 'meta.json.tmp')
+    with open(temp_path, 'w') as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(temp_path, os.path.join(upload_dir, 'meta.json'))
+
+def get_chunk_path(upload_dir, index):
+    return os.path.join(upload_dir, f'{index:06d}.part')
+
+def get_received_chunks(upload_dir):
+    return sorted(int(name[:-5]) for name in os.listdir(upload_dir) if name.endswith('.part'))
+
+def get_missing_chunks(received, total_chunks):
+    """Indexes below total_chunks that aren't in the sorted `received` list."""
+    missing = []
+    expected = 0
+    for index in received:
+        missing.extend(range(expected, index))
+        expected = index + 1
+    missing.extend(range(expected, total_chunks))
+    return missing
+
+def get_expected_chunk_size(meta, index):
+    if index == meta['total_chunks'] - 1:
+        return meta['size'] - meta['chunk_size'] * index
+    return meta['chunk_size']
+
+def get_completion_marker(upload_dir):
+    return os.path.join(upload_dir, 'completing')
+
+def describe_upload(upload_id, meta):
+    return {key: value for key, value in dict(meta, upload_id=upload_id).items() if key != 'client'}
+
+def get_staging_usage(client):
+    """Return (bytes reserved by `client`, uploads by `client`, bytes reserved overall).
+
+    The per-client figures only count uploads still in progress; completed
+    ones take up disk until CHUNKED_UPLOAD_COMPLETED_TTL so they count
+    towards the overall figure only.
+    """
+    client_bytes = client_uploads = total_bytes = 0
+    if not os.path.isdir(CHUNKED_UPLOAD_FOLDER):
+        return client_bytes, client_uploads, total_bytes
+
+    for upload_id in os.listdir(CHUNKED_UPLOAD_FOLDER):
+        try:
+            meta = load_upload_meta(os.path.join(CHUNKED_UPLOAD_FOLDER, upload_id))
+        except (OSError, ValueError):
+            continue  # half-created or being removed
+        total_bytes += meta['size']
+        if not meta['completed'] and meta.get('client') == client:
+            client_bytes += meta['size']
+            client_uploads += 1
+    return client_bytes, client_uploads, total_bytes
+
+def collect_abandoned_uploads():
+    """Delete unfinished uploads idle for CHUNKED_UPLOAD_TTL seconds and
+    completed ones unused for CHUNKED_UPLOAD_COMPLETED_TTL seconds."""
+    if not os.path.isdir(CHUNKED_UPLOAD_FOLDER):
+        return
+
+    now = time.time()
+    for upload_id in os.listdir(CHUNKED_UPLOAD_FOLDER):
+        path = os.path.join(CHUNKED_UPLOAD_FOLDER, upload_id)
+        try:
+            ttl = app.config['CHUNKED_UPLOAD_TTL']
+            try:
+                if load_upload_meta(path)['completed']:
+                    ttl = app.config['CHUNKED_UPLOAD_COMPLETED_TTL']
+            except (OSError, ValueError):
+                pass  # no readable metadata, treat as unfinished
+            if now - os.path.getmtime(path) > ttl:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass  # removed by another worker
+
+@app.before_request
+def schedule_upload_gc():
+    """Sweep the staging area in the background at most once per
+    CHUNKED_UPLOAD_GC_INTERVAL, whatever traffic the server gets."""
+    global last_upload_gc
+    now = time.time()
+    with chunked_upload_lock:
+        if now - last_upload_gc < CHUNKED_UPLOAD_GC_INTERVAL:
+            return None
+        last_upload_gc = now
+    threading.Thread(target=collect_abandoned_uploads, daemon=True).start()
+
+def open_chunked_upload(upload_id):
+    upload_dir = get_chunked_upload_dir(upload_id)
+    meta = load_upload_meta(upload_dir) if upload_dir else None
+    if meta is None or not meta['completed']:
+        abort(make_response(jsonify({'error': f'Unknown or incomplete upload: {upload_id}'}), 404))
+
+    os.utime(upload_dir)  # in use, keep it away from the garbage collector
+    stream = open(os.path.join(upload_dir, 'data'), 'rb')
+    g.setdefault('upload_streams', []).append(stream)
+    return FileStorage(stream=stream, filename=meta['filename'])
+
+def get_staged_path(file):
+    """Path of a chunked upload's data on disk, or None for an ordinary upload."""
+    name = getattr(file.stream, 'name', None)
+    if isinstance(name, str) and name.startswith(CHUNKED_UPLOAD_FOLDER + os.sep):
+        return name
+    return None
+
+def get_uploaded_file(field='file'):
+    """Return the file sent as `field`, or the completed chunked upload named
+    by the `upload_id` form field. None if neither was sent."""
+    if field in request.files:
+        return request.files[field]
+    upload_id = request.form.get('upload_id')
+    if upload_id:
+        return open_chunked_upload(upload_id)
+    return None
+
+def get_uploaded_files(field='files'):
+    """Files sent as `field` followed by any chunked uploads in `upload_ids`."""
+    files = request.files.getlist(field)
+    files += [open_chunked_upload(upload_id) for upload_id in request.form.getlist('upload_ids')]
+    return files
+
+@app.teardown_request
+def close_upload_streams(exc):
+    for stream in g.pop('upload_streams', []):
+        stream.close()
+
+# Rate limiting and fair-share scheduling
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+app.config['RATE_LIMIT_CAPACITY'] = float(os.environ.get('RATE_LIMIT_CAPACITY', 30))  # bucket size in tokens
+app.config['RATE_LIMIT_REFILL_RATE'] = float(os.environ.get('RATE_LIMIT_REFILL_RATE', 0.5))  # tokens per second
+app.config['MAX_CONCURRENT_JOBS'] = int(os.environ.get('MAX_CONCURRENT_JOBS', 4))
+app.config['JOB_QUEUE_TIMEOUT'] = float(os.environ.get('JOB_QUEUE_TIMEOUT', 30))  # seconds
+# Comma-separated keys that get their own bucket; any other X-API-Key is ignored
+app.config['API_KEYS'] = {key.strip() for key in os.environ.get('API_KEYS', '').split(',') if key.strip()}
+
+# Behind Railway's proxy every request arrives from the same address, so
+# set TRUST_PROXY_HEADERS=1 there for per-IP buckets to see the real client.
+# Leave it off anywhere clients connect directly, as they could then pick
+# a fresh bucket per request by forging X-Forwarded-For.
+if os.environ.get('TRUST_PROXY_HEADERS') == '1':
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+# Token cost per operation; anything not listed costs DEFAULT_OPERATION_COST
+OPERATION_COSTS = {
+    'compress-pdf': 5,
+    'html-to-pdf': 5,
+    'pdf-to-powerpoint': 3,
+    'pdf-to-word': 3,
+    'pdf-to-excel': 3,
+    'word-to-pdf': 3,
+    'powerpoint-to-pdf': 3,
+    'excel-to-pdf': 3,
+    'merge-pdf': 2,
+    'split-pdf': 2,
+    'pdf-to-jpg': 2,
+    'jpg-to-pdf': 2,
+    'pdf-search': 2,
+    'uploads/<upload_id>/chunks/<int:index>': 0.5,
+}
+DEFAULT_OPERATION_COST = 1
+RATE_LIMIT_EXEMPT_ENDPOINTS = {
+    'health_check', 'list_conversions', 'static', 'profile_report', 'profile_dump'
+}
+# Endpoints that only move bytes to or from disk don't take a job slot
+UNSCHEDULED_ENDPOINTS = {
+    'init_chunked_upload', 'upload_chunk', 'chunked_upload_status', 'delete_chunked_upload'
+}
+
+class MemoryRateLimitStore:
+    """In-process token buckets. Any object with the same take() method can
+    be set as app.config['RATE_LIMIT_STORE'] to share limits across workers."""
+
+    MAX_BUCKETS = 10000
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, last refill time)
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, capacity, refill_rate):
+        """Remove `cost` tokens from `key`'s bucket.
+
+        Returns (allowed, retry_after) where retry_after is the number of
+        seconds until enough tokens will be available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                allowed, retry_after = True, 0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, retry_after = False, (cost - tokens) / refill_rate
+
+            if len(self._buckets) > self.MAX_BUCKETS:
+                self._prune(now, capacity, refill_rate)
+
+        return allowed, retry_after
+
+    def _prune(self, now, capacity, refill_rate):
+        # A bucket that has refilled completely is the same as no bucket
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * refill_rate >= capacity:
+                del self._buckets[key]
+
+class RedisRateLimitStore:
+    """Token buckets kept in Redis so several app instances share limits."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local refill_rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local now = tonumber(ARGV[4])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * refill_rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill_rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(self.SCRIPT)
+
+    def take(self, key, cost, capacity, refill_rate):
+        allowed, tokens = self._script(
+            keys=[self.prefix + key],
+            args=[capacity, refill_rate, cost, time.time()]
+        )
+        if allowed:
+            return True, 0
+        return False, (cost - float(tokens)) / refill_rate
+
+if os.environ.get('REDIS_URL'):
+    app.config['RATE_LIMIT_STORE'] = RedisRateLimitStore(os.environ['REDIS_URL'])
+else:
+    app.config['RATE_LIMIT_STORE'] = MemoryRateLimitStore()
+
+class FairScheduler:
+    """Caps the number of jobs running at once and hands each free slot to
+    the waiting client with the fewest jobs running, then the one served
+    least recently, so a client with a deep queue can't starve everyone else."""
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._running = 0
+        self._active = {}  # client -> jobs running
+        self._last_served = {}  # client -> sequence number of last grant
+        self._waiting = []  # (arrival sequence, client)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _next_ticket(self):
+        return min(self._waiting, key=lambda ticket: (
+            self._active.get(ticket[1], 0),
+            self._last_served.get(ticket[1], -1),
+            ticket[0]
+        ))
+
+    def acquire(self, client, timeout):
+        """Wait up to `timeout` seconds for a slot. Returns True once one is held."""
+        ticket = (next(self._sequence), client)
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            self._waiting.append(ticket)
+            granted = False
+            try:
+                while self._running >= self.slots or self._next_ticket() != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+
+                self._running += 1
+                self._active[client] = self._active.get(client, 0) + 1
+                self._last_served[client] = next(self._sequence)
+                granted = True
+                return True
+            finally:
+                self._waiting.remove(ticket)
+                if not granted:
+                    self._forget_if_idle(client)
+                self._cond.notify_all()
+
+    def release(self, client):
+        with self._cond:
+            self._running -= 1
+            self._active[client] -= 1
+            if not self._active[client]:
+                del self._active[client]
+                self._forget_if_idle(client)
+            self._cond.notify_all()
+
+    def _forget_if_idle(self, client):
+        # Called with the condition held
+        if client in self._active or any(waiting == client for _, waiting in self._waiting):
+            return
+        self._last_served.pop(client, None)
+
+job_scheduler = FairScheduler(app.config['MAX_CONCURRENT_JOBS'])
+
+def get_client_id():
+    api_key = request.headers.get('X-API-Key')
+    if api_key and api_key in app.config['API_KEYS']:
+        return f"key:{api_key}"
+    return f"ip:{request.remote_addr}"
+
+def get_operation_cost():
+    operation = request.url_rule.rule.strip('/')
+    return OPERATION_COSTS.get(operation, DEFAULT_OPERATION_COST)
+
+def retry_later(message, retry_after, status):
+    response = jsonify({'error': message, 'retry_after': math.ceil(retry_after)})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+@app.before_request
+def enforce_rate_limit():
+    if not app.config['RATE_LIMIT_ENABLED'] or request.method == 'OPTIONS':
+        return None
+    if request.endpoint is None or request.endpoint in RATE_LIMIT_EXEMPT_ENDPOINTS:
+        return None
+
+    client = get_client_id()
+    capacity = app.config['RATE_LIMIT_CAPACITY']
+    cost = min(get_operation_cost(), capacity)
+
+    allowed, retry_after = app.config['RATE_LIMIT_STORE'].take(
+        client, cost, capacity, app.config['RATE_LIMIT_REFILL_RATE']
+    )
+    if not allowed:
+        return retry_later('Rate limit exceeded', retry_after, 429)
+
+    if request.endpoint in UNSCHEDULED_ENDPOINTS:
+        return None
+
+    # Read the whole body before queueing so a slot is only held for the
+    # processing itself, not for a slow client's upload
+    request.form
+
+    timeout = app.config['JOB_QUEUE_TIMEOUT']
+    if not job_scheduler.acquire(client, timeout):
+        return retry_later('Server busy, try again later', timeout, 503)
+    g.scheduled_client = client
+
+@app.teardown_request
+def release_job_slot(exc):
+    client = g.pop('scheduled_client', None)
+    if client is not None:
+        job_scheduler.release(client)
+
+# Per-route memory and CPU profiling (opt-in)
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED') == '1'
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # 0.0 - 1.0
+app.config['PROFILE_KEEP_SLOWEST'] = int(os.environ.get('PROFILE_KEEP_SLOWEST', 10))
+# Required as X-Profile-Token to force profiling with X-Profile or read /debug/profile
+app.config['PROFILE_TOKEN'] = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_EXEMPT_ENDPOINTS = {'health_check', 'profile_report', 'profile_dump', 'static'}
+PROFILE_TOP_ALLOCATIONS = 10
+
+def current_rss():
+    """Resident set size in bytes, or None where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def peak_rss():
+    """Highest resident set size the process has reached, in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def count_open_files():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+def count_temp_files():
+    return sum(1 for name in os.listdir(UPLOAD_FOLDER) if name.startswith('temp_'))
+
+def difference(after, before):
+    if after is None or before is None:
+        return None
+    return after - before
+
+class RouteProfiler:
+    """Aggregates profiled requests per route and keeps the cProfile stats of
+    the slowest ones.
+
+    tracemalloc and RSS are process-wide, so samples taken while other
+    requests run concurrently include their allocations too.
+    """
+
+    def __init__(self, keep_slowest):
+        self.keep_slowest = keep_slowest
+        self.routes = {}  # route -> aggregate counters
+        self.slowest = []  # samples sorted slowest first
+        self.cpu_profile_lock = threading.Lock()  # only one cProfile may be active at a time
+        self._traced_requests = 0
+        self._owns_tracing = False
+        self._tracing_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start_tracing(self):
+        """Make sure tracemalloc runs while a profiled request is in flight.
+
+        Returns True if other profiled requests are already running; their
+        allocations then also count towards this request's peak.
+        """
+        with self._tracing_lock:
+            self._traced_requests += 1
+            if self._traced_requests > 1:
+                return True
+            # Starting fresh also resets the peak
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracing = True
+            return False
+
+    def stop_tracing(self):
+        """Stop tracemalloc once the last profiled request has finished."""
+        with self._tracing_lock:
+            self._traced_requests -= 1
+            if not self._traced_requests and self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+
+    def record(self, sample, cpu_stats):
+        with self._lock:
+            sample['id'] = next(self._ids)
+            route = self.routes.setdefault(sample['route'], {
+                'requests': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+                'total_rss_delta': 0,
+                'max_peak_rss_delta': 0,
+                'max_peak_traced': 0,
+                'leaked_open_files': 0,
+                'leaked_temp_files': 0,
+            })
+            route['requests'] += 1
+            route['total_seconds'] += sample['seconds']
+            route['max_seconds'] = max(route['max_seconds'], sample['seconds'])
+            route['total_rss_delta'] += sample['rss_delta'] or 0
+            route['max_peak_rss_delta'] = max(route['max_peak_rss_delta'], sample['peak_rss_delta'] or 0)
+            route['max_peak_traced'] = max(route['max_peak_traced'], sample['peak_traced'])
+            route['leaked_open_files'] += max(0, sample['open_files_delta'] or 0)
+            route['leaked_temp_files'] += max(0, sample['temp_files_delta'])
+
+            self.slowest.append((sample, cpu_stats))
+            self.slowest.sort(key=lambda entry: entry[0]['seconds'], reverse=True)
+            del self.slowest[self.keep_slowest:]
+
+    def report(self):
+        with self._lock:
+            routes = {}
+            for name, route in self.routes.items():
+                routes[name] = dict(
+                    route,
+                    avg_seconds=route['total_seconds'] / route['requests'],
+                    avg_rss_delta=route['total_rss_delta'] / route['requests']
+                )
+            slowest = [dict(sample, has_cpu_profile=stats is not None) for sample, stats in self.slowest]
+        return {'routes': routes, 'slowest': slowest}
+
+    def cpu_profiles(self, limit):
+        with self._lock:
+            return [(sample, stats) for sample, stats in self.slowest[:limit] if stats is not None]
+
+route_profiler = RouteProfiler(app.config['PROFILE_KEEP_SLOWEST'])
+
+def has_profile_token():
+    token = app.config['PROFILE_TOKEN']
+    sent = request.headers.get('X-Profile-Token', '')
+    return bool(token) and hmac.compare_digest(sent.encode(), token.encode())
+
+@app.before_request
+def start_profiling():
+    if not app.config['PROFILING_ENABLED']:
+        return None
+    if request.endpoint is None or request.endpoint in PROFILE_EXEMPT_ENDPOINTS:
+        return None
+    forced = request.headers.get('X-Profile') == '1' and has_profile_token()
+    if not forced and random.random() >= app.config['PROFILE_SAMPLE_RATE']:
+        return None
+
+    overlapping = route_profiler.start_tracing()
+    g.profile = {
+        'overlapping': overlapping,
+        'started': time.perf_counter(),
+        'rss': current_rss(),
+        'peak_rss': peak_rss(),
+        'open_files': count_open_files(),
+        'temp_files': count_temp_files(),
+        'traced': tracemalloc.get_traced_memory()[0],
+        'snapshot': tracemalloc.take_snapshot(),
+        'cpu_profiler': None,
+    }
+
+    if route_profiler.cpu_profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool already owns the interpreter
+            route_profiler.cpu_profile_lock.release()
+        else:
+            g.profile['cpu_profiler'] = profiler
+
+@app.after_request
+def record_profile_status(response):
+    if 'profile' in g:
+        g.profile['status'] = response.status_code
+    return response
+
+@app.teardown_request
+def finish_profiling(exc):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return
+
+    # Teardowns run in reverse order, so close staged uploads here rather
+    # than count them as leaked handles
+    close_upload_streams(exc)
+
+    profiler = profile['cpu_profiler']
+    if profiler is not None:
+        profiler.disable()
+
+    seconds = time.perf_counter() - profile['started']
+    peak_traced = tracemalloc.get_traced_memory()[1] - profile['traced']
+    top_allocations = [
+        str(stat) for stat in
+        tracemalloc.take_snapshot().compare_to(profile['snapshot'], 'lineno')[:PROFILE_TOP_ALLOCATIONS]
+    ]
+    route_profiler.stop_tracing()
+
+    # Collect the cProfile stats only after the memory snapshot so their
+    # allocations don't show up as the route's
+    cpu_stats = None
+    if profiler is not None:
+        profiler.create_stats()
+        cpu_stats = profiler.stats
+        route_profiler.cpu_profile_lock.release()
+
+    route_profiler.record({
+        'route': request.url_rule.rule,
+        'method': request.method,
+        'status': profile.get('status', 500),
+        'timestamp': datetime.now().isoformat(),
+        'seconds': seconds,
+        'overlapping': profile['overlapping'],
+        'peak_traced': max(0, peak_traced),
+        'rss_delta': difference(current_rss(), profile['rss']),
+        # How far the request pushed the process high-water mark, which
+        # catches spikes freed again before teardown
+        'peak_rss_delta': difference(peak_rss(), profile['peak_rss']),
+        'open_files_delta': difference(count_open_files(), profile['open_files']),
+        'temp_files_delta': count_temp_files() - profile['temp_files'],
+        'top_allocations': top_allocations,
+    }, cpu_stats)
+
+@app.route('/debug/profile', methods=['GET'])
+def profile_report():
+    if not app.config['PROFILING_ENABLED']:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not has_profile_token():
+        return jsonify({'error': 'Invalid or missing X-Profile-Token'}), 403
+    return jsonify(route_profiler.report())
+
+@app.route('/debug/profile/cprofile', methods=['GET'])
+def profile_dump():
+    """Zip of .prof files for the slowest requests, readable with pstats."""
+    if not app.config['PROFILING_ENABLED']:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not has_profile_token():
+        return jsonify({'error': 'Invalid or missing X-Profile-Token'}), 403
+
+    limit = request.args.get('n', str(app.config['PROFILE_KEEP_SLOWEST']))
+    if not limit.isdigit() or int(limit) < 1:
+        return jsonify({'error': 'n must be a positive integer'}), 400
+    limit = int(limit)
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+        for sample, stats in route_profiler.cpu_profiles(limit):
+            route = sample['route'].strip('/').replace('/', '_') or 'root'
+            zip_file.writestr(f"{sample['id']}_{route}_{sample['seconds']:.3f}s.prof", marshal.dumps(stats))
+
+    zip_buffer.seek(0)
+    return send_file(zip_buffer, mimetype='application/zip', download_name='cprofile.zip')
+
 # Original image conversion endpoint
 @app.route('/convert-image', methods=['POST'])
 def convert_image():
-    if 'image' not in request.files:
+    image_file = get_uploaded_file('image')
+    if image_file is None:
         return jsonify({'error': 'No image uploaded'}), 400
-
-    image_file = request.files['image']
     target_format = request.form.get('format')
 
     if not target_format:
@@ -81,10 +748,9 @@ def convert_image():
 # 1. Merge PDF
 @app.route('/merge-pdf', methods=['POST'])
 def merge_pdf():
-    if 'files' not in request.files:
+    files = get_uploaded_files()
+    if not files:
         return jsonify({'error': 'No PDF files uploaded'}), 400
-    
-    files = request.files.getlist('files')
     if len(files) < 2:
         return jsonify({'error': 'At least 2 PDF files required for merging'}), 400
     
@@ -109,10 +775,9 @@ def merge_pdf():
 # 2. Split PDF
 @app.route('/split-pdf', methods=['POST'])
 def split_pdf():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
-    
-    file = request.files['file']
     split_type = request.form.get('split_type', 'all')  # 'all', 'range', 'single'
     page_range = request.form.get('page_range', '')
     
@@ -157,10 +822,9 @@ def split_pdf():
 # 3. Compress PDF
 @app.route('/compress-pdf', methods=['POST'])
 def compress_pdf():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
-    
-    file = request.files['file']
     compression_level = request.form.get('compression_level', 'medium')
     
     try:
@@ -213,11 +877,10 @@ def compress_pdf():
 # 4. PDF to Word
 @app.route('/pdf-to-word', methods=['POST'])
 def pdf_to_word():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
     
-    file = request.files['file']
-    
     try:
         # Extract text from PDF
         reader = PdfReader(file)
@@ -244,11 +907,10 @@ def pdf_to_word():
 # 5. PDF to PowerPoint
 @app.route('/pdf-to-powerpoint', methods=['POST'])
 def pdf_to_powerpoint():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
     
-    file = request.files['file']
-    
     try:
         reader = PdfReader(file)
         prs = Presentation()
@@ -277,11 +939,10 @@ def pdf_to_powerpoint():
 # 6. PDF to Excel
 @app.route('/pdf-to-excel', methods=['POST'])
 def pdf_to_excel():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
     
-    file = request.files['file']
-    
     try:
         reader = PdfReader(file)
         wb = Workbook()
@@ -316,11 +977,10 @@ def pdf_to_excel():
 # 7. Word to PDF
 @app.route('/word-to-pdf', methods=['POST'])
 def word_to_pdf():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No Word file uploaded'}), 400
     
-    file = request.files['file']
-    
     try:
         # Read Word document
         doc = Document(file)
@@ -350,11 +1010,10 @@ def word_to_pdf():
 # 8. PowerPoint to PDF
 @app.route('/powerpoint-to-pdf', methods=['POST'])
 def powerpoint_to_pdf():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PowerPoint file uploaded'}), 400
     
-    file = request.files['file']
-    
     try:
         prs = Presentation(file)
         pdf = FPDF()
@@ -386,11 +1045,10 @@ def powerpoint_to_pdf():
 # 9. Excel to PDF
 @app.route('/excel-to-pdf', methods=['POST'])
 def excel_to_pdf():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No Excel file uploaded'}), 400
     
-    file = request.files['file']
-    
     try:
         df = pd.read_excel(file)
         pdf = FPDF()
@@ -426,10 +1084,9 @@ def excel_to_pdf():
 # 10. Edit PDF (Add text/watermark)
 @app.route('/edit-pdf', methods=['POST'])
 def edit_pdf():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
-    
-    file = request.files['file']
     edit_text = request.form.get('text', 'Sample Text')
     x_pos = int(request.form.get('x', 100))
     y_pos = int(request.form.get('y', 100))
@@ -470,10 +1127,9 @@ def edit_pdf():
 # 11. PDF to JPG
 @app.route('/pdf-to-jpg', methods=['POST'])
 def pdf_to_jpg():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
-    
-    file = request.files['file']
     page_number = int(request.form.get('page', 1)) - 1
     
     try:
@@ -504,11 +1160,10 @@ def pdf_to_jpg():
 # 12. JPG to PDF
 @app.route('/jpg-to-pdf', methods=['POST'])
 def jpg_to_pdf():
-    if 'files' not in request.files:
+    files = get_uploaded_files()
+    if not files:
         return jsonify({'error': 'No image files uploaded'}), 400
     
-    files = request.files.getlist('files')
-    
     try:
         pdf = FPDF()
         
@@ -537,10 +1192,9 @@ def jpg_to_pdf():
 # 13. Sign PDF (Simple signature)
 @app.route('/sign-pdf', methods=['POST'])
 def sign_pdf():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
-    
-    file = request.files['file']
     signature_text = request.form.get('signature', 'Digital Signature')
     
     try:
@@ -576,10 +1230,9 @@ def sign_pdf():
 # 14. Watermark PDF
 @app.route('/watermark-pdf', methods=['POST'])
 def watermark_pdf():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
-    
-    file = request.files['file']
     watermark_text = request.form.get('watermark', 'CONFIDENTIAL')
     
     try:
@@ -617,10 +1270,9 @@ def watermark_pdf():
 # 15. Rotate PDF
 @app.route('/rotate-pdf', methods=['POST'])
 def rotate_pdf():
-    if 'file' not in request.files:
+    file = get_uploaded_file()
+    if file is None:
         return jsonify({'error': 'No PDF file uploaded'}), 400
-    
-    file = request.files['file']
     rotation = int(request.form.get('rotation', 90))
     
     try:
@@ -669,64 +1321,598 @@ def html_to_pdf():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# 17. Unlock PDF (Remove password - basic implementation)
+# PDF encryption helpers shared by /unlock-pdf and /protect-pdf
+ENCRYPTION_METHODS = {
+    'aes-256': 'PDF_ENCRYPT_AES_256',
+    'aes-128': 'PDF_ENCRYPT_AES_128',
+    'rc4-128': 'PDF_ENCRYPT_RC4_128',
+}
+PDF_PERMISSIONS = {
+    'print': 'PDF_PERM_PRINT',
+    'print-hq': 'PDF_PERM_PRINT_HQ',
+    'modify': 'PDF_PERM_MODIFY',
+    'copy': 'PDF_PERM_COPY',
+    'annotate': 'PDF_PERM_ANNOTATE',
+    'form': 'PDF_PERM_FORM',
+    'accessibility': 'PDF_PERM_ACCESSIBILITY',
+    'assemble': 'PDF_PERM_ASSEMBLE',
+}
+
+class PdfPasswordError(Exception):
+    """Raised when a PDF can't be opened or encrypted with the given password."""
+
+def get_pdf_uploads():
+    """Return the uploaded PDFs from either the `files` or the `file` field."""
+    files = [f for f in get_uploaded_files() if f and f.filename]
+    if files:
+        return files
+    file = get_uploaded_file()
+    return [file] if file is not None else []
+
+def send_pdf_results(results, download_name):
+    """Send a single PDF as-is, or several as a zip named after their uploads.
+
+    `results` are (filename, path) pairs; the caller removes the files.
+    """
+    if len(results) == 1:
+        return send_file(open(results[0][1], 'rb'), mimetype='application/pdf', download_name=download_name)
+
+    # Spool the zip to disk, batches of large staged uploads don't fit in memory
+    zip_buffer = tempfile.TemporaryFile(dir=UPLOAD_FOLDER)
+    used_names = set()
+    with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+        for i, (filename, path) in enumerate(results):
+            name = secure_filename(filename) or f'document_{i+1}.pdf'
+            if name in used_names:
+                name = f'{i+1}_{name}'
+            used_names.add(name)
+            zip_file.write(path, name)
+
+    zip_buffer.seek(0)
+    return send_file(zip_buffer, mimetype='application/zip', download_name=download_name.replace('.pdf', '.zip'))
+
+def remove_temp_files(results):
+    for _, path in results:
+        if os.path.exists(path):
+            os.remove(path)
+
+def open_pdf_upload(file):
+    # Staged uploads are opened in place instead of being read into memory
+    path = get_staged_path(file)
+    if path:
+        return fitz.open(path, filetype='pdf')
+    return fitz.open(stream=file.read(), filetype='pdf')
+
+def remove_encryption(file, password):
+    """Write an unencrypted copy of `file` to a temp file and return its path."""
+    # MuPDF only drops the security handler on save; pages and their
+    # streams are written straight through, not rebuilt object by object
+    doc = open_pdf_upload(file)
+    try:
+        # is_encrypted is False for files with only an owner password, but
+        # their restrictions still have to come off
+        if doc.needs_pass or doc.metadata.get('encryption'):
+            if not password:
+                raise PdfPasswordError('Password required for encrypted PDF')
+            if not doc.authenticate(password):
+                raise PdfPasswordError('Invalid password')
+
+        output = get_temp_filename('pdf')
+        doc.save(output, encryption=fitz.PDF_ENCRYPT_NONE)
+        return output
+    finally:
+        doc.close()
+
+def add_encryption(file, user_password, owner_password, permissions, method):
+    """Write an encrypted copy of `file` to a temp file and return its path."""
+    doc = open_pdf_upload(file)
+    try:
+        if doc.needs_pass or doc.metadata.get('encryption'):
+            raise PdfPasswordError('PDF is already encrypted, unlock it first')
+
+        output = get_temp_filename('pdf')
+        doc.save(
+            output,
+            encryption=method,
+            user_pw=user_password,
+            owner_pw=owner_password,
+            permissions=permissions
+        )
+        return output
+    finally:
+        doc.close()
+
+# 17. Unlock PDF (Remove password)
 @app.route('/unlock-pdf', methods=['POST'])
 def unlock_pdf():
-    if 'file' not in request.files:
+    files = get_pdf_uploads()
+    if not files:
         return jsonify({'error': 'No PDF file uploaded'}), 400
     
-    file = request.files['file']
     password = request.form.get('password', '')
     
+    results = []
     try:
-        reader = PdfReader(file)
-        
-        if reader.is_encrypted:
-            if not password:
-                return jsonify({'error': 'Password required for encrypted PDF'}), 400
-            
-            if not reader.decrypt(password):
-                return jsonify({'error': 'Invalid password'}), 400
-        
-        writer = PdfWriter()
-        for page in reader.pages:
-            writer.add_page(page)
-        
-        output = io.BytesIO()
-        writer.write(output)
-        output.seek(0)
+        for file in files:
+            try:
+                results.append((file.filename, remove_encryption(file, password)))
+            except PdfPasswordError as e:
+                return jsonify({'error': str(e), 'file': file.filename}), 400
         
-        return send_file(output, mimetype='application/pdf', download_name='unlocked.pdf')
+        return send_pdf_results(results, 'unlocked.pdf')
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    finally:
+        remove_temp_files(results)
 
 # 18. Protect PDF (Add password)
 @app.route('/protect-pdf', methods=['POST'])
 def protect_pdf():
-    if 'file' not in request.files:
+    files = get_pdf_uploads()
+    if not files:
         return jsonify({'error': 'No PDF file uploaded'}), 400
     
-    file = request.files['file']
-    password = request.form.get('password', 'default123')
+    user_password = request.form.get('password', '')
+    if not user_password:
+        return jsonify({'error': 'No password provided'}), 400
+    # An owner password equal to the user password would let anyone who can
+    # open the file lift its permissions, so make one up if none was given
+    # (24 bytes encode to 32 characters, inside the PDF limit of 40)
+    owner_password = request.form.get('owner_password') or secrets.token_urlsafe(24)
+    if owner_password == user_password:
+        return jsonify({'error': 'owner_password must differ from password'}), 400
+    
+    algorithm = request.form.get('algorithm', 'aes-256').lower()
+    if algorithm not in ENCRYPTION_METHODS:
+        return jsonify({'error': f'Unsupported algorithm, use one of: {", ".join(ENCRYPTION_METHODS)}'}), 400
     
+    # Without an explicit list every permission is granted, as before
+    allowed = request.form.getlist('permissions') or list(PDF_PERMISSIONS)
+    unknown = [name for name in allowed if name not in PDF_PERMISSIONS]
+    if unknown:
+        return jsonify({'error': f'Unknown permissions: {", ".join(unknown)}'}), 400
+    
+    results = []
     try:
-        reader = PdfReader(file)
-        writer = PdfWriter()
-        
-        for page in reader.pages:
-            writer.add_page(page)
+        method = getattr(fitz, ENCRYPTION_METHODS[algorithm])
+        permissions = 0
+        for name in allowed:
+            permissions |= getattr(fitz, PDF_PERMISSIONS[name])
         
-        writer.encrypt(password)
-        
-        output = io.BytesIO()
-        writer.write(output)
-        output.seek(0)
+        for file in files:
+            try:
+                path = add_encryption(file, user_password, owner_password, permissions, method)
+            except PdfPasswordError as e:
+                return jsonify({'error': str(e), 'file': file.filename}), 400
+            results.append((file.filename, path))
         
-        return send_file(output, mimetype='application/pdf', download_name='protected.pdf')
+        return send_pdf_results(results, 'protected.pdf')
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    finally:
+        remove_temp_files(results)
+
+# 19. Search PDF text
+app.config['SEARCH_INDEX_CACHE_SIZE'] = int(os.environ.get('SEARCH_INDEX_CACHE_SIZE', 32))
+# Each indexed word costs a few hundred bytes, so this keeps the cache to roughly 500MB
+app.config['SEARCH_INDEX_CACHE_MAX_WORDS'] = int(os.environ.get('SEARCH_INDEX_CACHE_MAX_WORDS', 2000000))
+SEARCH_PAGES_PER_CHUNK = 16
+SEARCH_PARALLEL_MIN_PAGES = 32  # smaller documents are indexed in-process
+WORD_EDGE_PUNCTUATION = '.,;:!?()[]{}<>"\'`\u2018\u2019\u201c\u201d'
+
+def normalize_word(word):
+    return word.strip(WORD_EDGE_PUNCTUATION).lower()
+
+def extract_page_words(path, start, stop):
+    """Return [(page_number, [(word, bbox), ...]), ...] for pages start..stop-1.
+
+    Runs in a worker process, so it opens its own copy of the document.
+    """
+    doc = fitz.open(path)
+    try:
+        pages = []
+        for page_number in range(start, stop):
+            words = doc.load_page(page_number).get_text("words")
+            pages.append((page_number, [
+                (w[4], (round(w[0], 2), round(w[1], 2), round(w[2], 2), round(w[3], 2)))
+                for w in words
+            ]))
+        return pages
+    finally:
+        doc.close()
+
+class PdfTextIndex:
+    """Inverted index of the words in a PDF with their page and position."""
+
+    def __init__(self, page_count):
+        self.page_count = page_count
+        self.pages = [[] for _ in range(page_count)]  # page -> [(word, bbox)]
+        self.postings = {}  # word -> [(page, position on page)]
+        self.word_count = 0
+
+    def add_page(self, page_number, words):
+        entries = self.pages[page_number]
+        for word, bbox in words:
+            token = normalize_word(word)
+            if not token:
+                continue
+            self.postings.setdefault(token, []).append((page_number, len(entries)))
+            entries.append((token, bbox))
+            self.word_count += 1
+
+    def search(self, query):
+        """Find every occurrence of `query`, matching multi-word queries as phrases."""
+        tokens = [token for token in (normalize_word(w) for w in query.split()) if token]
+        if not tokens:
+            return []
+
+        hits = []
+        for page_number, position in self.postings.get(tokens[0], []):
+            phrase = self.pages[page_number][position:position + len(tokens)]
+            if [token for token, _ in phrase] != tokens:
+                continue
+
+            rects = [bbox for _, bbox in phrase]
+            hits.append({
+                'page': page_number + 1,
+                'bbox': [
+                    min(r[0] for r in rects), min(r[1] for r in rects),
+                    max(r[2] for r in rects), max(r[3] for r in rects)
+                ],
+                'rects': rects
+            })
+        return hits
+
+search_index_cache = OrderedDict()  # document hash -> PdfTextIndex, least recently used first
+search_index_cache_words = 0
+search_index_lock = threading.Lock()
+search_executor = None
+
+def get_search_executor():
+    global search_executor
+    with search_index_lock:
+        if search_executor is None:
+            # Forking a threaded server can copy locks, MuPDF's included, in a
+            # held state and deadlock the child, so start workers fresh
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            search_executor = ProcessPoolExecutor(mp_context=context)
+        return search_executor
+
+def discard_search_executor(executor):
+    """Drop a broken pool so the next search starts a fresh one."""
+    global search_executor
+    with search_index_lock:
+        if search_executor is executor:
+            search_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def get_cached_index(document_hash):
+    with search_index_lock:
+        index = search_index_cache.get(document_hash)
+        if index is not None:
+            search_index_cache.move_to_end(document_hash)
+        return index
+
+def cache_index(document_hash, index):
+    global search_index_cache_words
+    max_words = app.config['SEARCH_INDEX_CACHE_MAX_WORDS']
+    if index.word_count > max_words:
+        return  # too big to keep; this request still gets its answer
+
+    with search_index_lock:
+        previous = search_index_cache.pop(document_hash, None)
+        if previous is not None:
+            search_index_cache_words -= previous.word_count
+        search_index_cache[document_hash] = index
+        search_index_cache_words += index.word_count
+
+        while (len(search_index_cache) > app.config['SEARCH_INDEX_CACHE_SIZE']
+               or search_index_cache_words > max_words):
+            _, evicted = search_index_cache.popitem(last=False)
+            search_index_cache_words -= evicted.word_count
+
+def hash_upload(file):
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.stream.read(1024 * 1024), b''):
+        digest.update(block)
+    file.stream.seek(0)
+    return digest.hexdigest()
+
+def build_text_index(path, page_count):
+    index = PdfTextIndex(page_count)
+
+    if page_count < SEARCH_PARALLEL_MIN_PAGES:
+        for page_number, words in extract_page_words(path, 0, page_count):
+            index.add_page(page_number, words)
+        return index
+
+    starts = range(0, page_count, SEARCH_PAGES_PER_CHUNK)
+    stops = [min(start + SEARCH_PAGES_PER_CHUNK, page_count) for start in starts]
+    executor = get_search_executor()
+    try:
+        # map() yields chunks in page order, so postings stay sorted by page
+        for chunk in executor.map(extract_page_words, [path] * len(stops), starts, stops):
+            for page_number, words in chunk:
+                index.add_page(page_number, words)
+    except BrokenProcessPool:
+        # A worker died, most likely MuPDF crashing on a malformed file.
+        # Retrying in-process could take the server down the same way.
+        discard_search_executor(executor)
+        raise RuntimeError('Indexing failed, the PDF may be malformed')
+    return index
+
+@app.route('/pdf-search', methods=['POST'])
+def pdf_search():
+    queries = [q for q in request.form.getlist('query') if q.strip()]
+    document_hash = request.form.get('document_hash', '')
+    file = get_uploaded_file()
+    staged_path = get_staged_path(file) if file is not None else None
+    cached = True
+
+    try:
+        if staged_path:
+            # Completed uploads already know their checksum
+            document_hash = load_upload_meta(os.path.dirname(staged_path))['sha256']
+        elif file is not None:
+            document_hash = hash_upload(file)
+        elif not document_hash:
+            return jsonify({'error': 'No PDF file or document_hash provided'}), 400
+
+        index = get_cached_index(document_hash)
+
+        if index is None:
+            if file is None:
+                return jsonify({'error': 'Document not indexed, upload the file again'}), 404
+
+            cached = False
+            # Staged uploads are indexed in place; only ordinary ones need a copy on disk
+            temp_file = None
+            if not staged_path:
+                temp_file = get_temp_filename('pdf')
+                file.save(temp_file)
+            path = staged_path or temp_file
+            try:
+                doc = fitz.open(path)
+                try:
+                    if doc.needs_pass:
+                        return jsonify({'error': 'Encrypted PDF, unlock it first'}), 400
+                    page_count = len(doc)
+                finally:
+                    doc.close()
+
+                index = build_text_index(path, page_count)
+            finally:
+                if temp_file:
+                    os.remove(temp_file)
+
+            cache_index(document_hash, index)
+
+        results = []
+        for query in queries:
+            hits = index.search(query)
+            results.append({
+                'query': query,
+                'pages': sorted({hit['page'] for hit in hits}),
+                'hits': hits
+            })
+
+        return jsonify({
+            'document_hash': document_hash,
+            'page_count': index.page_count,
+            'cached': cached,
+            'results': results
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 20. Chunked uploads
+@app.route('/uploads', methods=['POST'])
+def init_chunked_upload():
+    filename = secure_filename(request.form.get('filename', ''))
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'Missing or unsupported filename'}), 400
+
+    try:
+        size = int(request.form.get('size', 0))
+        chunk_size = int(request.form.get('chunk_size', DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({'error': 'size and chunk_size must be integers'}), 400
+
+    if not 0 < size <= app.config['CHUNKED_UPLOAD_MAX_SIZE']:
+        return jsonify({'error': f"size must be between 1 and {app.config['CHUNKED_UPLOAD_MAX_SIZE']} bytes"}), 400
+    chunk_size = min(chunk_size, size)
+    if not (MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE or chunk_size == size):
+        return jsonify({'error': f'chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes'}), 400
+    total_chunks = math.ceil(size / chunk_size)
+    if total_chunks > MAX_TOTAL_CHUNKS:
+        return jsonify({'error': f'Too many chunks, use a chunk_size of at least {math.ceil(size / MAX_TOTAL_CHUNKS)} bytes'}), 400
+
+    # Only a hash of the client id is staged, so API keys never reach the disk
+    client = hashlib.sha256(get_client_id().encode()).hexdigest()
+
+    try:
+        # Quota checks and the new reservation happen together so parallel
+        # inits can't both squeeze into the last free space
+        with chunked_upload_lock:
+            client_bytes, client_uploads, total_bytes = get_staging_usage(client)
+            if client_uploads >= app.config['CHUNKED_UPLOAD_CLIENT_MAX_UPLOADS']:
+                return jsonify({'error': 'Too many uploads in progress, complete or delete some first'}), 429
+            if client_bytes + size > app.config['CHUNKED_UPLOAD_CLIENT_QUOTA']:
+                return jsonify({'error': 'Upload quota exceeded, complete or delete some uploads first'}), 429
+            os.makedirs(CHUNKED_UPLOAD_FOLDER, exist_ok=True)
+            if (total_bytes + size > app.config['CHUNKED_UPLOAD_TOTAL_QUOTA']
+                    or shutil.disk_usage(CHUNKED_UPLOAD_FOLDER).free < size):
+                return jsonify({'error': 'Not enough storage for this upload, try again later'}), 507
+
+            upload_id = uuid.uuid4().hex
+            upload_dir = os.path.join(CHUNKED_UPLOAD_FOLDER, upload_id)
+            os.makedirs(upload_dir)
+
+            meta = {
+                'filename': filename,
+                'size': size,
+                'chunk_size': chunk_size,
+                'total_chunks': total_chunks,
+                'sha256': request.form.get('sha256', '').lower() or None,
+                'completed': False,
+                'client': client,
+            }
+            save_upload_meta(upload_dir, meta)
+
+        return jsonify(describe_upload(upload_id, meta)), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, index):
+    upload_dir = get_chunked_upload_dir(upload_id)
+    if upload_dir is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+
+    expected_sha256 = request.headers.get('X-Chunk-SHA256', '').lower()
+    if not expected_sha256:
+        return jsonify({'error': 'X-Chunk-SHA256 header required'}), 400
+
+    temp_path = None
+    try:
+        meta = load_upload_meta(upload_dir)
+        if meta['completed'] or os.path.exists(get_completion_marker(upload_dir)):
+            return jsonify({'error': 'Upload already completed'}), 409
+        if not 0 <= index < meta['total_chunks']:
+            return jsonify({'error': 'Chunk index out of range'}), 400
+
+        expected_size = get_expected_chunk_size(meta, index)
+
+        # Each request streams into its own temp file, so a retry racing the
+        # original can't truncate it; whichever finishes intact is published
+        digest = hashlib.sha256()
+        received = 0
+        fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=f'{index:06d}.', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as chunk_file:
+            for block in iter(lambda: request.stream.read(COPY_BLOCK_SIZE), b''):
+                received += len(block)
+                if received > expected_size:
+                    break
+                digest.update(block)
+                chunk_file.write(block)
+
+        if received != expected_size:
+            return jsonify({'error': f'Chunk {index} must be {expected_size} bytes'}), 400
+        if digest.hexdigest() != expected_sha256:
+            return jsonify({'error': f'Checksum mismatch for chunk {index}'}), 400
+
+        os.replace(temp_path, get_chunk_path(upload_dir, index))
+
+        return jsonify({'upload_id': upload_id, 'index': index, 'received': len(get_received_chunks(upload_dir))})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    upload_dir = get_chunked_upload_dir(upload_id)
+    if upload_dir is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+
+    try:
+        meta = load_upload_meta(upload_dir)
+        status = describe_upload(upload_id, meta)
+        if not meta['completed']:
+            received = get_received_chunks(upload_dir)
+            status['received'] = received
+            status['missing'] = get_missing_chunks(received, meta['total_chunks'])
+        return jsonify(status)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/uploads/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    upload_dir = get_chunked_upload_dir(upload_id)
+    if upload_dir is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+
+    # The marker file locks just this upload, across workers too, while
+    # its chunks are joined
+    marker = get_completion_marker(upload_dir)
+    try:
+        os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return jsonify({'error': 'Upload is already being completed'}), 409
+
+    try:
+        meta = load_upload_meta(upload_dir)
+        if meta['completed']:
+            return jsonify(describe_upload(upload_id, meta))
+
+        missing = get_missing_chunks(get_received_chunks(upload_dir), meta['total_chunks'])
+        if missing:
+            return jsonify({'error': 'Upload incomplete', 'missing': missing}), 400
+
+        # Every chunk was checked when it arrived, but make sure nothing on
+        # disk changed since, as the whole-file checksum is optional
+        bad_chunks = [
+            index for index in range(meta['total_chunks'])
+            if os.path.getsize(get_chunk_path(upload_dir, index)) != get_expected_chunk_size(meta, index)
+        ]
+        if bad_chunks:
+            for index in bad_chunks:
+                os.remove(get_chunk_path(upload_dir, index))
+            return jsonify({'error': 'Some chunks are damaged, upload them again', 'missing': bad_chunks}), 400
+
+        # Join the chunks into one file, hashing as it is written
+        digest = hashlib.sha256()
+        temp_path = os.path.join(upload_dir, 'data.tmp')
+        with open(temp_path, 'wb') as data_file:
+            for index in range(meta['total_chunks']):
+                with open(get_chunk_path(upload_dir, index), 'rb') as chunk_file:
+                    for block in iter(lambda: chunk_file.read(COPY_BLOCK_SIZE), b''):
+                        digest.update(block)
+                        data_file.write(block)
+
+        expected_sha256 = request.form.get('sha256', '').lower() or meta['sha256']
+        if expected_sha256 and digest.hexdigest() != expected_sha256:
+            os.remove(temp_path)
+            return jsonify({'error': 'Checksum mismatch for assembled file'}), 400
+
+        os.replace(temp_path, os.path.join(upload_dir, 'data'))
+        for index in range(meta['total_chunks']):
+            os.remove(get_chunk_path(upload_dir, index))
+
+        meta['sha256'] = digest.hexdigest()
+        meta['completed'] = True
+        save_upload_meta(upload_dir, meta)
+
+        return jsonify(describe_upload(upload_id, meta))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    finally:
+        try:
+            os.remove(marker)
+        except OSError:
+            pass  # upload deleted meanwhile
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def delete_chunked_upload(upload_id):
+    upload_dir = get_chunked_upload_dir(upload_id)
+    if upload_dir is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+
+    shutil.rmtree(upload_dir, ignore_errors=True)
+    return jsonify({'upload_id': upload_id, 'deleted': True})
 
 # Health check endpoint
 @app.route('/health', methods=['GET'])
@@ -739,7 +1925,8 @@ def list_conversions():
     conversions = {
         'PDF Operations': [
             'merge-pdf', 'split-pdf', 'compress-pdf', 'rotate-pdf', 
-            'watermark-pdf', 'sign-pdf', 'edit-pdf', 'unlock-pdf', 'protect-pdf'
+            'watermark-pdf', 'sign-pdf', 'edit-pdf', 'unlock-pdf', 'protect-pdf',
+            'pdf-search'
         ],
         'PDF Conversions': [
             'pdf-to-word', 'pdf-to-powerpoint', 'pdf-to-excel', 'pdf-to-jpg'
@@ -750,6 +1937,9 @@ def list_conversions():
         ],
         'Image Conversions': [
             'convert-image'
+        ],
+        'Uploads': [
+            'uploads'
         ]
     }
     return jsonify(conversions)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+
+
+@pytest.fixture
+def app():
+    original = dict(app_module.app.config)
+    app_module.app.config.update(TESTING=True, RATE_LIMIT_ENABLED=False)
+    yield app_module.app
+    app_module.app.config.update(original)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_pdf():
+    def make_pdf(*page_texts):
+        doc = app_module.fitz.open()
+        for text in page_texts or ('hello',):
+            doc.new_page().insert_text((72, 72), text)
+        data = doc.tobytes()
+        doc.close()
+        return data
+    return make_pdf
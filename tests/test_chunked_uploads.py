@@ -0,0 +1,239 @@
+import hashlib
+import io
+import os
+import time
+
+import fitz
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture(autouse=True)
+def staging(app, monkeypatch, tmp_path):
+    original = dict(app.config)
+    monkeypatch.setattr(app_module, 'CHUNKED_UPLOAD_FOLDER', str(tmp_path / 'chunked_uploads'))
+    monkeypatch.setattr(app_module, 'MIN_CHUNK_SIZE', 256)
+    yield
+    app.config.update(original)
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def init(client, size, chunk_size, **form):
+    form.update(filename='doc.pdf', size=size, chunk_size=chunk_size)
+    return client.post('/uploads', data=form)
+
+
+def put_chunk(client, upload_id, index, data, checksum=None):
+    return client.put(
+        f'/uploads/{upload_id}/chunks/{index}',
+        data=data,
+        headers={'X-Chunk-SHA256': checksum or sha256(data)}
+    )
+
+
+def upload(client, data, chunk_size=256):
+    upload_id = init(client, len(data), chunk_size, sha256=sha256(data)).get_json()['upload_id']
+    for index, start in enumerate(range(0, len(data), chunk_size)):
+        assert put_chunk(client, upload_id, index, data[start:start + chunk_size]).status_code == 200
+    assert client.post(f'/uploads/{upload_id}/complete').status_code == 200
+    return upload_id
+
+
+def test_resumable_flow(client, make_pdf):
+    data = make_pdf('one', 'two', 'three')
+    chunks = [data[i:i + 256] for i in range(0, len(data), 256)]
+
+    response = init(client, len(data), 256, sha256=sha256(data))
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['total_chunks'] == len(chunks)
+    assert 'client' not in body
+    upload_id = body['upload_id']
+
+    assert put_chunk(client, upload_id, 0, chunks[0], checksum='0' * 64).status_code == 400
+    assert put_chunk(client, upload_id, 0, chunks[0][:-1]).status_code == 400
+    assert put_chunk(client, upload_id, 1, chunks[1]).status_code == 200
+
+    status = client.get(f'/uploads/{upload_id}').get_json()
+    assert status['received'] == [1]
+    assert status['missing'] == [0] + list(range(2, len(chunks)))
+    assert client.post(f'/uploads/{upload_id}/complete').status_code == 400
+
+    for index, chunk in enumerate(chunks):
+        put_chunk(client, upload_id, index, chunk)
+
+    body = client.post(f'/uploads/{upload_id}/complete').get_json()
+    assert body['completed'] is True
+    assert body['sha256'] == sha256(data)
+    assert put_chunk(client, upload_id, 0, chunks[0]).status_code == 409
+
+    response = client.post('/split-pdf', data={'upload_id': upload_id})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+
+    assert client.delete(f'/uploads/{upload_id}').status_code == 200
+    assert client.post('/split-pdf', data={'upload_id': upload_id}).status_code == 404
+
+
+def test_whole_file_checksum_is_verified(client):
+    data = os.urandom(300)
+    upload_id = init(client, len(data), 256, sha256='0' * 64).get_json()['upload_id']
+    put_chunk(client, upload_id, 0, data[:256])
+    put_chunk(client, upload_id, 1, data[256:])
+
+    response = client.post(f'/uploads/{upload_id}/complete')
+    assert response.status_code == 400
+    assert 'Checksum' in response.get_json()['error']
+
+
+def test_tiny_chunks_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'MIN_CHUNK_SIZE', 1024 * 1024)
+    assert init(client, 2 * 1024 * 1024 * 1024, 1).status_code == 400
+    # A file smaller than the minimum goes up as a single chunk
+    assert init(client, 10, 1024).get_json()['total_chunks'] == 1
+
+
+def test_missing_chunks():
+    assert app_module.get_missing_chunks([], 3) == [0, 1, 2]
+    assert app_module.get_missing_chunks([0, 2, 5], 7) == [1, 3, 4, 6]
+    assert app_module.get_missing_chunks([0, 1, 2], 3) == []
+
+
+def test_staging_quotas(app, client):
+    app.config.update(CHUNKED_UPLOAD_CLIENT_QUOTA=1000, CHUNKED_UPLOAD_CLIENT_MAX_UPLOADS=2)
+    assert init(client, 600, 256).status_code == 201
+    assert init(client, 600, 256).status_code == 429
+    assert init(client, 300, 256).status_code == 201
+    assert init(client, 10, 256).status_code == 429
+
+    app.config.update(CHUNKED_UPLOAD_CLIENT_QUOTA=10000, CHUNKED_UPLOAD_CLIENT_MAX_UPLOADS=10,
+                      CHUNKED_UPLOAD_TOTAL_QUOTA=1000)
+    assert init(client, 200, 256).status_code == 507
+
+
+def test_concurrent_completion_is_refused(client):
+    data = os.urandom(100)
+    upload_id = init(client, len(data), 256).get_json()['upload_id']
+    put_chunk(client, upload_id, 0, data)
+
+    upload_dir = app_module.get_chunked_upload_dir(upload_id)
+    open(app_module.get_completion_marker(upload_dir), 'w').close()
+    assert client.post(f'/uploads/{upload_id}/complete').status_code == 409
+
+    os.remove(app_module.get_completion_marker(upload_dir))
+    assert client.post(f'/uploads/{upload_id}/complete').status_code == 200
+
+
+def test_protect_opens_staged_upload_by_path(client, make_pdf, monkeypatch):
+    upload_id = upload(client, make_pdf('staged'))
+    opened = []
+    real_open = app_module.fitz.open
+
+    def tracking_open(*args, **kwargs):
+        opened.append(args)
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(app_module.fitz, 'open', tracking_open)
+    response = client.post('/protect-pdf', data={'upload_id': upload_id, 'password': 'user'})
+    monkeypatch.undo()
+
+    assert response.status_code == 200
+    assert opened[0][0].endswith(os.path.join(upload_id, 'data'))
+    doc = fitz.open(stream=response.data, filetype='pdf')
+    assert doc.authenticate('user')
+    assert 'staged' in doc[0].get_text()
+
+
+def test_staged_streams_are_not_reported_as_leaks(app, client, make_pdf):
+    upload_id = upload(client, make_pdf())
+    app.config.update(PROFILING_ENABLED=True, PROFILE_TOKEN='secret')
+    app_module.route_profiler.routes.clear()
+
+    headers = {'X-Profile': '1', 'X-Profile-Token': 'secret'}
+    for _ in range(3):
+        assert client.post('/rotate-pdf', data={'upload_id': upload_id}, headers=headers).status_code == 200
+
+    assert app_module.route_profiler.routes['/rotate-pdf']['leaked_open_files'] == 0
+
+
+def test_completed_uploads_do_not_count_as_in_progress(app, client, make_pdf):
+    app.config.update(CHUNKED_UPLOAD_CLIENT_MAX_UPLOADS=2)
+    upload(client, make_pdf())
+    upload(client, make_pdf())
+    assert init(client, 300, 256).status_code == 201
+    assert init(client, 300, 256).status_code == 201
+    assert init(client, 300, 256).status_code == 429
+
+
+def test_failed_chunk_leaves_nothing_behind(client):
+    data = os.urandom(300)
+    upload_id = init(client, len(data), 256).get_json()['upload_id']
+    assert put_chunk(client, upload_id, 0, data[:256], checksum='0' * 64).status_code == 400
+
+    upload_dir = app_module.get_chunked_upload_dir(upload_id)
+    assert sorted(os.listdir(upload_dir)) == ['meta.json']
+
+
+def test_complete_rejects_damaged_chunks(client):
+    data = os.urandom(300)
+    upload_id = init(client, len(data), 256).get_json()['upload_id']
+    put_chunk(client, upload_id, 0, data[:256])
+    put_chunk(client, upload_id, 1, data[256:])
+
+    upload_dir = app_module.get_chunked_upload_dir(upload_id)
+    with open(app_module.get_chunk_path(upload_dir, 0), 'r+b') as chunk_file:
+        chunk_file.truncate(100)
+
+    response = client.post(f'/uploads/{upload_id}/complete')
+    assert response.status_code == 400
+    assert response.get_json()['missing'] == [0]
+    assert client.get(f'/uploads/{upload_id}').get_json()['missing'] == [0]
+
+
+def test_garbage_collection(app, client, make_pdf):
+    finished = upload(client, make_pdf())
+    unfinished = init(client, 300, 256).get_json()['upload_id']
+    for upload_id in (finished, unfinished):
+        past = os.path.getmtime(app_module.get_chunked_upload_dir(upload_id)) - 2 * 60 * 60
+        os.utime(app_module.get_chunked_upload_dir(upload_id), (past, past))
+
+    app_module.collect_abandoned_uploads()
+    assert app_module.get_chunked_upload_dir(finished) is None
+    assert app_module.get_chunked_upload_dir(unfinished) is not None
+
+    app.config['CHUNKED_UPLOAD_TTL'] = 60
+    app_module.collect_abandoned_uploads()
+    assert app_module.get_chunked_upload_dir(unfinished) is None
+
+
+def test_garbage_collection_runs_on_any_request(client, monkeypatch):
+    swept = []
+    monkeypatch.setattr(app_module, 'collect_abandoned_uploads', lambda: swept.append(True))
+    monkeypatch.setattr(app_module, 'last_upload_gc', 0.0)
+
+    client.get('/health')
+    client.get('/health')
+    deadline = time.monotonic() + 1
+    while not swept and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert swept == [True]
+
+
+def test_search_indexes_staged_upload_in_place(client, make_pdf, monkeypatch):
+    data = make_pdf('needle')
+    upload_id = upload(client, data)
+
+    def no_copy(*args, **kwargs):
+        raise AssertionError('staged upload should not be re-read')
+
+    monkeypatch.setattr(app_module, 'hash_upload', no_copy)
+    monkeypatch.setattr(app_module.FileStorage, 'save', no_copy)
+    app_module.search_index_cache.clear()
+
+    body = client.post('/pdf-search', data={'upload_id': upload_id, 'query': 'needle'}).get_json()
+    assert body['document_hash'] == sha256(data)
+    assert body['results'][0]['pages'] == [1]
@@ -0,0 +1,69 @@
+import io
+import zipfile
+
+import fitz
+
+
+def protect(client, data, **form):
+    form['file'] = (io.BytesIO(data), 'doc.pdf')
+    return client.post('/protect-pdf', data=form)
+
+
+def unlock(client, data, password):
+    return client.post('/unlock-pdf', data={'file': (io.BytesIO(data), 'doc.pdf'), 'password': password})
+
+
+def test_protect_requires_password(client, make_pdf):
+    response = protect(client, make_pdf())
+    assert response.status_code == 400
+
+
+def test_protect_unlock_round_trip(client, make_pdf):
+    response = protect(client, make_pdf('secret text'), password='user', owner_password='owner', permissions='print')
+    assert response.status_code == 200
+
+    doc = fitz.open(stream=response.data, filetype='pdf')
+    assert doc.needs_pass
+    assert doc.authenticate('user') == 2  # user rights only
+    assert doc.metadata['encryption'].endswith('256-bit AES')
+    assert doc.permissions & fitz.PDF_PERM_PRINT
+    assert not doc.permissions & fitz.PDF_PERM_COPY
+
+    assert unlock(client, response.data, 'wrong').status_code == 400
+
+    response = unlock(client, response.data, 'user')
+    assert response.status_code == 200
+    doc = fitz.open(stream=response.data, filetype='pdf')
+    assert not doc.needs_pass
+    assert doc.metadata['encryption'] is None
+    assert 'secret text' in doc[0].get_text()
+
+
+def test_user_password_never_grants_owner_rights(client, make_pdf):
+    response = protect(client, make_pdf(), password='user')
+    doc = fitz.open(stream=response.data, filetype='pdf')
+    assert doc.authenticate('user') == 2
+
+    response = protect(client, make_pdf(), password='same', owner_password='same')
+    assert response.status_code == 400
+
+
+def test_unlock_removes_owner_only_encryption(client, make_pdf):
+    doc = fitz.open(stream=make_pdf(), filetype='pdf')
+    data = doc.tobytes(encryption=fitz.PDF_ENCRYPT_AES_256, owner_pw='owner', user_pw='', permissions=fitz.PDF_PERM_PRINT)
+    assert not fitz.open(stream=data, filetype='pdf').is_encrypted
+
+    assert unlock(client, data, '').status_code == 400
+    response = unlock(client, data, 'owner')
+    assert response.status_code == 200
+    assert fitz.open(stream=response.data, filetype='pdf').metadata['encryption'] is None
+
+
+def test_batch_protect_returns_zip(client, make_pdf):
+    response = client.post('/protect-pdf', data={
+        'files': [(io.BytesIO(make_pdf()), 'a.pdf'), (io.BytesIO(make_pdf()), 'a.pdf')],
+        'password': 'user',
+    })
+    assert response.mimetype == 'application/zip'
+    names = zipfile.ZipFile(io.BytesIO(response.data)).namelist()
+    assert names == ['a.pdf', '2_a.pdf']
@@ -0,0 +1,85 @@
+import io
+import os
+
+import pytest
+
+import app as app_module
+from app import PdfTextIndex
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(app):
+    original = dict(app.config)
+    app_module.search_index_cache.clear()
+    app_module.search_index_cache_words = 0
+    yield
+    app.config.update(original)
+    app_module.search_index_cache.clear()
+    app_module.search_index_cache_words = 0
+
+
+def make_index(word_count):
+    index = PdfTextIndex(1)
+    index.add_page(0, [(f'word{i}', (0, 0, 1, 1)) for i in range(word_count)])
+    return index
+
+
+def test_phrase_search_returns_pages_and_boxes():
+    index = PdfTextIndex(2)
+    index.add_page(0, [('The', (0, 0, 10, 10)), ('quick', (12, 0, 30, 10)), ('fox.', (32, 0, 50, 10))])
+    index.add_page(1, [('quick', (0, 20, 10, 30)), ('brown', (12, 20, 30, 30))])
+
+    hits = index.search('Quick fox')
+    assert [hit['page'] for hit in hits] == [1]
+    assert hits[0]['bbox'] == [12, 0, 50, 10]
+    assert [hit['page'] for hit in index.search('quick')] == [1, 2]
+    assert index.search('missing') == []
+    assert index.word_count == 5
+
+
+def test_endpoint_answers_repeat_queries_from_cache(client, make_pdf):
+    data = make_pdf('alpha beta', 'beta gamma')
+    response = client.post('/pdf-search', data={'file': (io.BytesIO(data), 'a.pdf'), 'query': 'beta'})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['cached'] is False
+    assert body['results'][0]['pages'] == [1, 2]
+
+    response = client.post('/pdf-search', data={'document_hash': body['document_hash'], 'query': ['gamma', 'alpha beta']})
+    body = response.get_json()
+    assert body['cached'] is True
+    assert [result['pages'] for result in body['results']] == [[2], [1]]
+
+
+def test_cache_is_bounded_by_word_count(app):
+    app.config['SEARCH_INDEX_CACHE_MAX_WORDS'] = 100
+    app_module.cache_index('a', make_index(60))
+    app_module.cache_index('b', make_index(30))
+    app_module.cache_index('c', make_index(30))
+
+    assert list(app_module.search_index_cache) == ['b', 'c']
+    assert app_module.search_index_cache_words == 60
+
+    app_module.cache_index('huge', make_index(101))
+    assert 'huge' not in app_module.search_index_cache
+
+
+def test_broken_pool_is_replaced(monkeypatch, tmp_path, make_pdf):
+    monkeypatch.setattr(app_module, 'SEARCH_PARALLEL_MIN_PAGES', 1)
+    path = tmp_path / 'doc.pdf'
+    path.write_bytes(make_pdf('hello'))
+
+    executor = app_module.get_search_executor()
+    executor.submit(os._exit, 1).exception()
+
+    with pytest.raises(RuntimeError):
+        app_module.build_text_index(str(path), 1)
+
+    index = app_module.build_text_index(str(path), 1)
+    assert index.search('hello')[0]['page'] == 1
+    assert app_module.search_executor is not executor
+
+
+def test_search_pool_does_not_fork():
+    executor = app_module.get_search_executor()
+    assert executor._mp_context.get_start_method() != 'fork'
@@ -0,0 +1,82 @@
+import io
+import tracemalloc
+import zipfile
+
+import pytest
+
+import app as app_module
+
+TOKEN = {'X-Profile-Token': 'secret'}
+
+
+@pytest.fixture
+def profiling_app(app):
+    original = dict(app.config)
+    app.config.update(PROFILING_ENABLED=True, PROFILE_SAMPLE_RATE=0, PROFILE_TOKEN='secret')
+    app_module.route_profiler.routes.clear()
+    app_module.route_profiler.slowest.clear()
+    yield app
+    app.config.update(original)
+
+
+def rotate(client, make_pdf, headers):
+    return client.post('/rotate-pdf', data={'file': (io.BytesIO(make_pdf()), 'a.pdf')}, headers=headers)
+
+
+def test_profile_header_needs_token(profiling_app, client, make_pdf):
+    rotate(client, make_pdf, {'X-Profile': '1'})
+    assert app_module.route_profiler.routes == {}
+
+    rotate(client, make_pdf, dict(TOKEN, **{'X-Profile': '1'}))
+    assert app_module.route_profiler.routes['/rotate-pdf']['requests'] == 1
+
+
+def test_tracing_stops_after_profiled_request(profiling_app, client, make_pdf):
+    assert not tracemalloc.is_tracing()
+    rotate(client, make_pdf, dict(TOKEN, **{'X-Profile': '1'}))
+    assert not tracemalloc.is_tracing()
+
+
+def test_report_needs_token(profiling_app, client, make_pdf):
+    rotate(client, make_pdf, dict(TOKEN, **{'X-Profile': '1'}))
+
+    assert client.get('/debug/profile').status_code == 403
+    assert client.get('/debug/profile/cprofile').status_code == 403
+
+    report = client.get('/debug/profile', headers=TOKEN).get_json()
+    sample = report['slowest'][0]
+    assert sample['route'] == '/rotate-pdf'
+    assert sample['status'] == 200
+    assert sample['overlapping'] is False
+    assert sample['open_files_delta'] == 0
+    assert sample['peak_rss_delta'] >= 0
+
+
+def test_peak_rss_catches_freed_spike(profiling_app, client, monkeypatch):
+    def spike():
+        block = bytearray(200 * 1024 * 1024)
+        del block
+        return app_module.jsonify({'status': 'ok'})
+
+    monkeypatch.setitem(profiling_app.view_functions, 'list_conversions', spike)
+    client.get('/conversions', headers=dict(TOKEN, **{'X-Profile': '1'}))
+
+    sample = app_module.route_profiler.report()['slowest'][0]
+    assert sample['peak_rss_delta'] >= 100 * 1024 * 1024
+    assert sample['rss_delta'] < 100 * 1024 * 1024
+
+
+def test_cprofile_dump(profiling_app, client, make_pdf):
+    rotate(client, make_pdf, dict(TOKEN, **{'X-Profile': '1'}))
+
+    response = client.get('/debug/profile/cprofile?n=1', headers=TOKEN)
+    names = zipfile.ZipFile(io.BytesIO(response.data)).namelist()
+    assert len(names) == 1
+    assert names[0].endswith('.prof')
+
+    assert client.get('/debug/profile/cprofile?n=x', headers=TOKEN).status_code == 400
+    assert client.get('/debug/profile/cprofile?n=0', headers=TOKEN).status_code == 400
+
+
+def test_debug_endpoints_hidden_when_disabled(client):
+    assert client.get('/debug/profile', headers=TOKEN).status_code == 404
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from app import FairScheduler, MemoryRateLimitStore
+
+
+@pytest.fixture
+def limited_app(app):
+    store = MemoryRateLimitStore()
+    original = dict(app.config)
+    app.config.update(
+        RATE_LIMIT_ENABLED=True,
+        RATE_LIMIT_CAPACITY=10,
+        RATE_LIMIT_REFILL_RATE=1,
+        RATE_LIMIT_STORE=store,
+        API_KEYS={'good-key'},
+    )
+    yield app
+    app.config.update(original)
+
+
+def test_bucket_allows_up_to_capacity_then_rejects():
+    store = MemoryRateLimitStore()
+    assert store.take('a', 4, 10, 1) == (True, 0)
+    assert store.take('a', 6, 10, 1) == (True, 0)
+
+    allowed, retry_after = store.take('a', 3, 10, 1)
+    assert not allowed
+    assert retry_after == pytest.approx(3, abs=0.1)
+
+
+def test_bucket_refills_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app_module.time, 'monotonic', lambda: now[0])
+    store = MemoryRateLimitStore()
+
+    assert store.take('a', 10, 10, 2)[0]
+    assert not store.take('a', 4, 10, 2)[0]
+    now[0] += 2
+    assert store.take('a', 4, 10, 2)[0]
+    # Refill never exceeds capacity
+    now[0] += 1000
+    assert store.take('a', 10, 10, 2)[0]
+    assert not store.take('a', 1, 10, 2)[0]
+
+
+def test_buckets_are_per_key():
+    store = MemoryRateLimitStore()
+    assert store.take('a', 10, 10, 1)[0]
+    assert store.take('b', 10, 10, 1)[0]
+    assert not store.take('a', 1, 10, 1)[0]
+
+
+def test_rejection_has_retry_after(limited_app, client):
+    assert client.post('/compress-pdf').status_code == 400
+    assert client.post('/compress-pdf').status_code == 400
+    response = client.post('/compress-pdf')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_unknown_api_keys_share_the_ip_bucket(limited_app, client):
+    statuses = [
+        client.post('/compress-pdf', headers={'X-API-Key': f'made-up-{i}'}).status_code
+        for i in range(3)
+    ]
+    assert statuses == [400, 400, 429]
+
+
+def test_known_api_key_gets_its_own_bucket(limited_app, client):
+    client.post('/compress-pdf')
+    client.post('/compress-pdf')
+    assert client.post('/compress-pdf').status_code == 429
+    assert client.post('/compress-pdf', headers={'X-API-Key': 'good-key'}).status_code == 400
+
+
+def test_scheduler_times_out_when_full():
+    scheduler = FairScheduler(1)
+    assert scheduler.acquire('a', 1)
+    assert not scheduler.acquire('b', 0.05)
+    scheduler.release('a')
+    assert scheduler.acquire('b', 0.05)
+
+
+def test_scheduler_serves_light_client_before_heavy_backlog():
+    scheduler = FairScheduler(1)
+    order = []
+
+    def job(client):
+        assert scheduler.acquire(client, 5)
+        order.append(client)
+        scheduler.release(client)
+
+    scheduler.acquire('heavy', 1)
+    threads = []
+    for client in ['heavy', 'heavy', 'heavy', 'light']:
+        thread = threading.Thread(target=job, args=(client,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)
+
+    scheduler.release('heavy')
+    for thread in threads:
+        thread.join()
+
+    assert order[0] == 'light'
+    assert order.count('heavy') == 3
+    assert scheduler._active == {}
+    assert scheduler._last_served == {}
+
+
+def test_scheduler_forgets_clients_whose_wait_timed_out():
+    scheduler = FairScheduler(1)
+    assert scheduler.acquire('other', 1)
+    assert scheduler.acquire('a', 0.01) is False
+    assert 'a' not in scheduler._last_served
+
+    # 'a' holds the slot with a second ticket queued behind it. When it
+    # releases, the never-served 'b' wins the slot and that ticket times out.
+    scheduler.release('other')
+    assert scheduler.acquire('a', 1)
+    waiter = threading.Thread(target=scheduler.acquire, args=('a', 0.1))
+    waiter.start()
+    time.sleep(0.02)
+    scheduler.release('a')
+    assert scheduler.acquire('b', 1)
+    waiter.join()
+
+    assert 'a' not in scheduler._last_served